@@ -8,6 +8,7 @@ import sys
 import os
 import jieba
 import jieba.analyse
+from datetime import date
 
 # 添加模块路径
 sys.path.append(os.path.join(os.path.dirname(__file__), 'modules'))
@@ -36,9 +37,43 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# --- 缓存层 ---
+# Streamlit 每次交互都会重跑整个脚本，这里把网络请求和模型初始化缓存起来，
+# 缓存键带上 date.today()，跨天自动失效
+@st.cache_resource
+def get_db_manager():
+    # 初始化失败时抛出异常：st.cache_resource 不缓存异常，下次重跑会重新尝试连接
+    db_manager = DatabaseManager()
+    if not db_manager.initialized:
+        db_manager.close()
+        raise RuntimeError("MySQL 数据库初始化失败")
+    return db_manager
+
+@st.cache_data(ttl=300, show_spinner=False)
+def cached_realtime_data(ticker, day):
+    return get_realtime_data(ticker)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def cached_news(ticker, day):
+    return get_news(ticker)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def cached_news_sentiment(news_headlines):
+    return analyze_news_sentiment(list(news_headlines))
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def get_predictor(ticker, day):
+    # 训练好的模型常驻进程内存，限制条目数避免换股票时无限增长
+    return PricePredictor(ticker)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def cached_prediction(_predictor, ticker, day, current_price, sentiment_score):
+    # _predictor 以下划线开头，不参与缓存键计算
+    return _predictor.predict_next(current_price, sentiment_score)
+
 def main():
     try:
-        db_manager = DatabaseManager()
+        db_manager = get_db_manager()
     except Exception:
         db_manager = None
     
@@ -90,12 +125,13 @@ def main():
     if analyze_button and ticker:
         try:
             with st.spinner(f"正在全网抓取 {ticker} 数据并进行AI分析..."):
-                current_price, historical_data = get_realtime_data(ticker)
-                news_headlines = get_news(ticker)
-                sentiment_result = analyze_news_sentiment(news_headlines)
+                today = date.today()
+                current_price, historical_data = cached_realtime_data(ticker, today)
+                news_headlines = cached_news(ticker, today)
+                sentiment_result = cached_news_sentiment(tuple(news_headlines))
                 sentiment_score = sentiment_result['sentiment_score']
-                predictor = PricePredictor(ticker)
-                prediction = predictor.predict_next(current_price, sentiment_score)
+                predictor = get_predictor(ticker, today)
+                prediction = cached_prediction(predictor, ticker, today, current_price, sentiment_score)
                 if db_manager: db_manager.save_record(ticker, current_price, prediction, sentiment_score)
 
             # 1. 核心指标
@@ -2,14 +2,18 @@
 数据加载模块
 功能：
 1. 使用 Tushare API 获取中国股市实时/历史数据
-2. 使用 Requests + BeautifulSoup 爬取实时财经新闻 (优先)
+2. 使用 Requests + BeautifulSoup (lxml) 爬取实时财经新闻 (优先)
 3. 如果爬取失败，使用模拟数据兜底 (保证演示稳定性)
 """
+import streamlit as st
 import tushare as ts
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import random  # 必须要导入 random
 
@@ -17,6 +21,42 @@ import random  # 必须要导入 random
 ts.set_token('28bc1c29f82fb0f6aa7060d4524e96f87fa0d61ed18a6f45eab30389')
 pro = ts.pro_api()
 
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def _fetch_daily(ticker, start_date, end_date):
+    """
+    调用 Tushare 获取日线并清洗 (按 ticker + 日期范围在内存中缓存 1 小时)
+    收盘后最多一小时即可取到当天的新 K 线；end_date 是当天日期，跨天后缓存键自动变化
+    """
+    # 只请求用到的字段，减少网络传输和 DataFrame 内存
+    df = pro.daily(
+        ts_code=ticker, start_date=start_date, end_date=end_date,
+        fields='trade_date,open,high,low,close,vol'
+    )
+    
+    if df.empty:
+        raise ValueError(f"Tushare 未找到股票 {ticker} 的数据")
+
+    # 数据清洗与格式转换
+    df['trade_date'] = pd.to_datetime(df['trade_date'], format='%Y%m%d')
+    df.set_index('trade_date', inplace=True)
+    df.sort_index(ascending=True, inplace=True)
+    
+    # 重命名列
+    df.rename(columns={
+        'open': 'Open',
+        'high': 'High',
+        'low': 'Low',
+        'close': 'Close',
+        'vol': 'Volume'
+    }, inplace=True)
+    
+    # 价格列降为 float32，减半下游绘图/相关性计算的数据量
+    # (成交量单位为"手"且可能带小数，保持原始浮点类型)
+    price_cols = ['Open', 'High', 'Low', 'Close']
+    df[price_cols] = df[price_cols].astype(np.float32)
+    
+    return df
+
 def get_realtime_data(ticker):
     """
     获取股票数据 (使用 Tushare)
@@ -26,25 +66,8 @@ def get_realtime_data(ticker):
         end_date = datetime.now().strftime('%Y%m%d')
         start_date = (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')
         
-        # 2. 调用 Tushare 接口
-        df = pro.daily(ts_code=ticker, start_date=start_date, end_date=end_date)
-        
-        if df.empty:
-            raise ValueError(f"Tushare 未找到股票 {ticker} 的数据")
-
-        # 3. 数据清洗与格式转换
-        df['trade_date'] = pd.to_datetime(df['trade_date'])
-        df.set_index('trade_date', inplace=True)
-        df.sort_index(ascending=True, inplace=True)
-        
-        # 重命名列
-        df.rename(columns={
-            'open': 'Open',
-            'high': 'High',
-            'low': 'Low',
-            'close': 'Close',
-            'vol': 'Volume'
-        }, inplace=True)
+        # 2. 调用 Tushare 接口 (命中缓存时不再发起网络请求)
+        df = _fetch_daily(ticker, start_date, end_date)
         
         current_price = df['Close'].iloc[-1]
         
@@ -54,59 +77,98 @@ def get_realtime_data(ticker):
         print(f"Tushare 获取数据失败: {e}")
         raise e
 
-def get_news(ticker):
-    """
-    增强版新闻爬虫 + 模拟兜底
-    策略：
-    1. 尝试 爬虫方案 A (中新网)
-    2. 尝试 爬虫方案 B (新浪财经)
-    3. 兜底: 如果都失败，返回模拟数据
-    """
-    news_headlines = []
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    }
+# 爬虫请求头
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+}
 
-    print(f"--- 开始爬取新闻: {ticker} ---")
+# 复用连接池的 Session，后续请求省去 TCP + TLS 握手
+_SESSION = requests.Session()
+_SESSION.headers.update(HEADERS)
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4, pool_maxsize=8,
+    # 不重试 (与原来的 requests.get 一致)：失败直接交给下一个方案或模拟数据兜底
+    max_retries=0
+))
+
+# 两个爬虫方案并发请求，最坏等待时间从 3+3 秒降为 3 秒
+# 线程池由所有会话共享，按多个会话同时爬取留足线程，避免排队等待
+_SCRAPE_POOL = ThreadPoolExecutor(max_workers=8)
 
-    # === 爬虫方案 A: 中国新闻网 ===
+# get_news 等待爬虫结果的总时长 (秒)，超时直接使用模拟数据
+_NEWS_WAIT = 4
+
+def _scrape_chinanews():
+    """爬虫方案 A: 中国新闻网"""
+    news_headlines = []
     try:
         url = "https://www.chinanews.com.cn/finance/index.shtml"
-        response = requests.get(url, headers=headers, timeout=3)
-        response.encoding = 'utf-8'
+        response = _SESSION.get(url, timeout=3)
         
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            links = soup.select('div.content_list ul li a')
-            if not links: links = soup.select('ul li a')
+            # lxml (C 实现) 直接解析字节流，比纯 Python 的 html.parser 快得多
+            soup = BeautifulSoup(response.content, 'lxml', from_encoding='utf-8')
+            # href 过滤交给 CSS 属性选择器，循环里只剩标题长度判断
+            links = soup.select('div.content_list ul li a[href*="http"]')
+            if not links: links = soup.select('ul li a[href*="http"]')
 
-            count = 0
             for link in links:
                 title = link.get_text().strip()
-                if len(title) > 8 and "http" in link.get('href', ''):
+                if len(title) > 8:
+                    news_headlines.append(title)
+                    if len(news_headlines) >= 8: break
+    except Exception:
+        pass # 失败了静默跳过，使用下一个方案
+    return news_headlines
+
+def _scrape_sina():
+    """爬虫方案 B: 新浪财经"""
+    news_headlines = []
+    try:
+        url = "https://finance.sina.com.cn/roll/index.d.html?cid=100872"
+        response = _SESSION.get(url, timeout=3)
+        
+        if response.status_code == 200:
+            # 新浪页面为 UTF-8 或 GB18030，直接按顺序尝试解码，
+            # 避免 apparent_encoding 用 chardet 扫描整个页面
+            try:
+                html = response.content.decode('utf-8')
+            except UnicodeDecodeError:
+                html = response.content.decode('gb18030', errors='ignore')
+            soup = BeautifulSoup(html, 'lxml')
+            links = soup.select('ul.list_009 li a')
+            for link in links[:8]:
+                title = link.get_text().strip()
+                if len(title) > 5:
                     news_headlines.append(title)
-                    count += 1
-                if count >= 8: break
     except Exception:
-        pass # 失败了静默跳过，尝试下一个
+        pass
+    return news_headlines
+
+def _result_before(future, deadline):
+    """在截止时间前取爬虫结果，超时返回空列表"""
+    try:
+        return future.result(timeout=max(0, deadline - time.monotonic()))
+    except FutureTimeoutError:
+        return []
+
+def get_news(ticker):
+    """
+    增强版新闻爬虫 + 模拟兜底
+    策略：
+    1. 并发请求 爬虫方案 A (中新网) 和 爬虫方案 B (新浪财经)
+    2. 优先使用方案 A 的结果，为空时使用方案 B
+    3. 兜底: 如果都失败 (或等待超时)，返回模拟数据
+    """
+    print(f"--- 开始爬取新闻: {ticker} ---")
+
+    future_a = _SCRAPE_POOL.submit(_scrape_chinanews)
+    future_b = _SCRAPE_POOL.submit(_scrape_sina)
 
-    # === 爬虫方案 B: 新浪财经 ===
+    deadline = time.monotonic() + _NEWS_WAIT
+    news_headlines = _result_before(future_a, deadline)
     if not news_headlines:
-        try:
-            url = "https://finance.sina.com.cn/roll/index.d.html?cid=100872"
-            response = requests.get(url, headers=headers, timeout=3)
-            response.encoding = response.apparent_encoding 
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                links = soup.select('ul.list_009 li a')
-                for link in links[:8]:
-                    title = link.get_text().strip()
-                    if len(title) > 5:
-                        news_headlines.append(title)
-        except Exception:
-            pass
+        news_headlines = _result_before(future_b, deadline)
 
     # === 最终兜底: 模拟数据 (原始代码逻辑) ===
     if not news_headlines:
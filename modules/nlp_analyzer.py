@@ -7,7 +7,25 @@
 from snownlp import SnowNLP
 import jieba
 import jieba.analyse
+import numpy as np
 import re
+import statistics
+from functools import lru_cache
+
+# 预编译正则：只保留中文、英文、数字和基本标点 (含中文标点)
+_CLEAN_RE = re.compile(r'[^\w\s\-\.\!\?\,\:;\"\'\u4e00-\u9fa5，。！？、；：“”‘’]')
+_WS_RE = re.compile(r'\s+')
+
+# 关键词提取保留的词性：名词类 + 动词/动名词
+_ALLOW_POS = ('n', 'nr', 'ns', 'nt', 'nz', 'v', 'vn')
+
+# 预热 Jieba：导入时加载词典、IDF 表和词性标注器，避免首次分析时的冷启动延迟
+# (app.py 侧边栏的 extract_tags 调用共享同一个默认 TF-IDF 实例)
+try:
+    jieba.initialize()
+    jieba.analyse.extract_tags('初始化', topK=1, allowPOS=_ALLOW_POS)
+except Exception as e:
+    print(f"Jieba 预热失败: {e}")
 
 def clean_text(text):
     """
@@ -16,13 +34,42 @@ def clean_text(text):
     if not isinstance(text, str):
         return ""
     
-    # 移除特殊字符，只保留中文、英文、数字和基本标点
-    # 增加对中文标点的支持
-    text = re.sub(r'[^\w\s\-\.\!\?\,\:;\"\'\u4e00-\u9fa5，。！？、；：“”‘’]', '', text)
-    # 去除多余空格
-    text = ' '.join(text.split())
+    # 移除特殊字符，并去除多余空格
+    return _WS_RE.sub(' ', _CLEAN_RE.sub('', text)).strip()
+
+@lru_cache(maxsize=4096)
+def _snownlp_score(clean_text_data):
+    """
+    对单条已清洗文本打分并映射到 -1~1 (带缓存，模板化标题可直接复用结果)
+    """
+    s = SnowNLP(clean_text_data)
+    score = s.sentiments  # SnowNLP 返回 0.0 (消极) ~ 1.0 (积极)
     
-    return text
+    # === 分数映射 ===
+    # 将 0~1 映射到 -1~1，保持与原项目逻辑兼容
+    # 0 -> -1
+    # 0.5 -> 0
+    # 1 -> 1
+    return (score - 0.5) * 2
+
+def _score_one(text):
+    """
+    单条文本打分 (清洗 + SnowNLP)
+    
+    Returns:
+        float | None: 情感得分 (-1 到 1)，文本为空或分析失败时返回 None
+    """
+    # 清理文本
+    clean_text_data = clean_text(text)
+    if not clean_text_data:
+        return None
+        
+    try:
+        # === 核心修改：使用 SnowNLP ===
+        return _snownlp_score(clean_text_data)
+    except Exception as e:
+        print(f"SnowNLP 分析失败: {text[:10]}..., 错误: {e}")
+        return None
 
 def analyze_sentiment(text_list):
     """
@@ -34,49 +81,21 @@ def analyze_sentiment(text_list):
     Returns:
         float: 情感得分 (-1 到 1, 以适配预测模型)
     """
+    # 单个文本走快速路径，不再包装成列表
     if isinstance(text_list, str):
-        text_list = [text_list]
+        score = _score_one(text_list)
+        return round(score, 3) if score is not None else 0.0
     
     if not text_list:
         return 0.0
     
-    sentiment_scores = []
-    
-    for text in text_list:
-        if not text or not isinstance(text, str):
-            continue
-            
-        # 清理文本
-        clean_text_data = clean_text(text)
-        if not clean_text_data:
-            continue
-            
-        try:
-            # === 核心修改：使用 SnowNLP ===
-            s = SnowNLP(clean_text_data)
-            score = s.sentiments  # SnowNLP 返回 0.0 (消极) ~ 1.0 (积极)
-            
-            # === 分数映射 ===
-            # 将 0~1 映射到 -1~1，保持与原项目逻辑兼容
-            # 0 -> -1
-            # 0.5 -> 0
-            # 1 -> 1
-            mapped_score = (score - 0.5) * 2
-            
-            sentiment_scores.append(mapped_score)
-            
-        except Exception as e:
-            print(f"SnowNLP 分析失败: {text[:10]}..., 错误: {e}")
-            continue
+    sentiment_scores = [score for score in map(_score_one, text_list) if score is not None]
     
     if not sentiment_scores:
         return 0.0
     
-    # 计算平均得分
-    avg_sentiment = sum(sentiment_scores) / len(sentiment_scores)
-    
-    # 保留3位小数
-    return round(avg_sentiment, 3)
+    # 计算平均得分，保留3位小数
+    return round(statistics.fmean(sentiment_scores), 3)
 
 def get_sentiment_label(sentiment_score):
     """
@@ -108,26 +127,23 @@ def analyze_news_sentiment(news_headlines):
             'total_news': 0
         }
     
-    detailed_scores = []
-    positive_count = 0
-    negative_count = 0
-    neutral_count = 0
+    # 去重后只对唯一标题打分 (空文本或失败记为 0，即中性)
+    unique_headlines = list(dict.fromkeys(news_headlines))
+    unique_scores = np.fromiter(
+        (_score_one(headline) or 0.0 for headline in unique_headlines),
+        dtype=float, count=len(unique_headlines)
+    )
+    unique_scores = np.round(unique_scores, 3)
     
-    for headline in news_headlines:
-        score = analyze_sentiment(headline)
-        detailed_scores.append(score)
-        
-        if score >= 0.1:
-            positive_count += 1
-        elif score <= -0.1:
-            negative_count += 1
-        else:
-            neutral_count += 1
+    # 按原顺序映射回每条标题，得分数组交给 NumPy 统计
+    position = {headline: i for i, headline in enumerate(unique_headlines)}
+    scores = unique_scores[[position[headline] for headline in news_headlines]]
     
-    if not detailed_scores:
-        avg_score = 0.0
-    else:
-        avg_score = sum(detailed_scores) / len(detailed_scores)
+    detailed_scores = scores.tolist()
+    positive_count = int((scores >= 0.1).sum())
+    negative_count = int((scores <= -0.1).sum())
+    neutral_count = len(scores) - positive_count - negative_count
+    avg_score = float(scores.mean()) if len(scores) else 0.0
     
     return {
         'sentiment_score': round(avg_score, 3),
@@ -156,9 +172,16 @@ def extract_keywords(text_list, top_n=10):
         keywords = jieba.analyse.extract_tags(
             text, 
             topK=top_n, 
-            allowPOS=('n', 'nr', 'ns', 'nt', 'nz', 'v', 'vn') 
+            allowPOS=_ALLOW_POS
         )
         return keywords
     except Exception as e:
         print(f"关键词提取失败: {e}")
-        return []
\ No newline at end of file
+        return []
+
+# 预热 SnowNLP：首次访问 sentiments 时才会从磁盘反序列化贝叶斯分类器，
+# 导入时触发一次，后续分析直接复用已加载的模型
+try:
+    SnowNLP('预热').sentiments
+except Exception as e:
+    print(f"SnowNLP 预热失败: {e}")
@@ -4,13 +4,45 @@
 """
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, r2_score
+from numpy.lib.stride_tricks import sliding_window_view
+from utils.indicators import rolling_mean
+import hashlib
+import os
+import time
 import warnings
-warnings.filterwarnings('ignore')
+from functools import lru_cache
+import joblib
+
+# 简单预测使用的随机数生成器 (模块级复用)
+_rng = np.random.default_rng(0)
+
+# 训练好的模型缓存目录 (项目根目录下)
+MODEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.model_cache')
+# 模型缓存版本号：修改训练代码或超参数时加 1，旧缓存自动失效
+_MODEL_CACHE_VERSION = 1
+# 缓存目录最多保留的模型文件数 (按修改时间淘汰最旧的)
+_MODEL_CACHE_MAX_FILES = 64
+
+def _prune_model_cache():
+    """清理模型缓存目录，只保留最新的 _MODEL_CACHE_MAX_FILES 个文件"""
+    try:
+        paths = [
+            os.path.join(MODEL_CACHE_DIR, name)
+            for name in os.listdir(MODEL_CACHE_DIR) if name.endswith('.joblib')
+        ]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[_MODEL_CACHE_MAX_FILES:]:
+            os.remove(path)
+    except Exception as e:
+        print(f"模型缓存清理失败: {e}")
+
+@lru_cache(maxsize=32)
+def _cached_realtime(ticker, bucket):
+    """
+    按 (股票代码, 分钟桶) 缓存行情数据，训练和预测在同一分钟内只取一次数据
+    """
+    from modules.data_loader import get_realtime_data
+    return get_realtime_data(ticker)
 
 class PricePredictor:
     """
@@ -27,7 +59,9 @@ class PricePredictor:
         """
         self.ticker = ticker.upper()
         self.model = None
-        self.scaler = StandardScaler()
+        # 特征标准化参数 (训练集均值 / 标准差)
+        self._mean = None
+        self._scale = None
         self.is_trained = False
         self.feature_names = ['moving_avg', 'previous_close', 'volume_ma', 'volatility']
         
@@ -44,39 +78,88 @@ class PricePredictor:
         Returns:
             np.array: 特征矩阵
         """
-        features = []
-        
         # 确保数据按日期排序
         data = data.sort_index()
         
-        for i in range(len(data)):
-            row = data.iloc[i]
-            
-            # 移动平均线 (5日)
-            if i >= 4:
-                ma_5 = data['Close'].iloc[i-4:i+1].mean()
-            else:
-                ma_5 = row['Close']
-            
-            # 前一日收盘价
-            prev_close = data['Close'].iloc[i-1] if i > 0 else row['Close']
-            
-            # 成交量移动平均 (5日)
-            if i >= 4:
-                volume_ma = data['Volume'].iloc[i-4:i+1].mean()
-            else:
-                volume_ma = row['Volume']
-            
-            # 波动率 (5日)
-            if i >= 4:
-                returns = data['Close'].iloc[i-4:i+1].pct_change().dropna()
-                volatility = returns.std() if len(returns) > 0 else 0
-            else:
-                volatility = 0
+        close = data['Close'].to_numpy(dtype=np.float64)
+        volume = data['Volume'].to_numpy(dtype=np.float64)
+        n = len(close)
+        
+        # 前 4 行窗口不足：均线取当日值，波动率记 0
+        ma_5 = close.copy()
+        volume_ma = volume.copy()
+        volatility = np.zeros(n)
+        
+        # 前一日收盘价 (第一行用当日收盘价)
+        prev_close = close.copy()
+        prev_close[1:] = close[:-1]
+        
+        if n >= 5:
+            # 移动平均线 / 成交量移动平均 (5日)
+            ma_5[4:] = rolling_mean(close, 5)[4:]
+            volume_ma[4:] = rolling_mean(volume, 5)[4:]
             
-            features.append([ma_5, prev_close, volume_ma, volatility])
+            # 波动率 (5日窗口内 4 个日收益率的样本标准差)
+            returns = np.diff(close) / close[:-1]
+            volatility[4:] = sliding_window_view(returns, 4).std(axis=1, ddof=1)
+        
+        # 在 float64 下计算，输出 float32 (价格只有两位小数，精度足够，且与随机森林内部类型一致)
+        return np.column_stack([ma_5, prev_close, volume_ma, volatility]).astype(np.float32)
+    
+    def _features_last(self, close, volume):
+        """
+        计算最后一个交易日的特征 (与 _prepare_features 最后一行一致)
+        
+        Args:
+            close (np.array): 最近 5 日收盘价
+            volume (np.array): 最近 5 日成交量
         
-        return np.array(features)
+        Returns:
+            np.array: 特征向量
+        """
+        returns = np.diff(close) / close[:-1]
+        return np.array([close.mean(), close[-2], volume.mean(), returns.std(ddof=1)], dtype=np.float32)
+    
+    def _fit_scaler(self, X):
+        """
+        计算特征标准化参数 (与 StandardScaler 一致：标准差为 0 的列不缩放)
+        
+        Args:
+            X (np.array): 训练特征矩阵
+        """
+        self._mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+        self._scale = scale
+    
+    def _standardize(self, X):
+        """
+        使用训练集参数标准化特征
+        
+        Args:
+            X (np.array): 特征矩阵
+        
+        Returns:
+            np.array: 标准化后的特征矩阵
+        """
+        return (X - self._mean) / self._scale
+    
+    def _model_cache_path(self, X, y):
+        """
+        根据股票代码和训练数据内容生成模型缓存文件路径
+        
+        Args:
+            X (np.array): 特征矩阵
+            y (np.array): 目标变量
+        
+        Returns:
+            str: 缓存文件路径
+        """
+        digest = hashlib.sha1(
+            f"v{_MODEL_CACHE_VERSION}:{self.ticker}".encode()
+            + np.ascontiguousarray(X).tobytes() + np.ascontiguousarray(y).tobytes()
+        ).hexdigest()
+        return os.path.join(MODEL_CACHE_DIR, f"{digest}.joblib")
     
     def _train_model(self):
         """
@@ -84,8 +167,7 @@ class PricePredictor:
         """
         try:
             # 获取训练数据
-            from modules.data_loader import get_realtime_data
-            current_price, historical_data = get_realtime_data(self.ticker)
+            current_price, historical_data = _cached_realtime(self.ticker, int(time.time() // 60))
             
             if len(historical_data) < 10:
                 print(f"数据不足，使用简单预测方法")
@@ -105,40 +187,74 @@ class PricePredictor:
                 self.is_trained = False
                 return
             
-            # 分割训练和测试数据
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+            # 相同股票 + 相同训练数据命中磁盘缓存时直接加载，跳过训练
+            cache_path = self._model_cache_path(X, y)
+            if os.path.exists(cache_path):
+                try:
+                    self.model, self._mean, self._scale = joblib.load(cache_path)
+                    self.is_trained = True
+                    print(f"已从缓存加载模型: {cache_path}")
+                    return
+                except Exception as e:
+                    print(f"模型缓存加载失败，重新训练: {e}")
+            
+            # 按需导入 sklearn (导入较慢，只在真正需要训练时加载)
+            from sklearn.ensemble import RandomForestRegressor
+            from sklearn.linear_model import LinearRegression
+            from sklearn.metrics import mean_absolute_error, r2_score
+            
+            # 按时间顺序分割训练和测试数据 (前 80% 训练)，避免用未来数据训练
+            split = int(len(X) * 0.8)
+            X_train, X_test = X[:split], X[split:]
+            y_train, y_test = y[:split], y[split:]
             
             # 特征标准化
-            X_train_scaled = self.scaler.fit_transform(X_train)
-            X_test_scaled = self.scaler.transform(X_test)
+            self._fit_scaler(X_train)
+            X_train_scaled = self._standardize(X_train)
+            X_test_scaled = self._standardize(X_test)
             
             # 尝试多个模型，选择最好的
-            models = {
-                'RandomForest': RandomForestRegressor(n_estimators=100, random_state=42),
-                'LinearRegression': LinearRegression()
-            }
+            # 样本量只有一两百行，20 棵浅树已足够，并行使用全部核心
+            models = {'LinearRegression': LinearRegression()}
+            if len(X_train) >= 30:
+                # 样本太少时随机森林没有优势，直接跳过
+                models['RandomForest'] = RandomForestRegressor(
+                    n_estimators=20, max_depth=8, max_features='sqrt',
+                    n_jobs=-1, random_state=42
+                )
             
             best_score = -np.inf
             best_model = None
             
-            for name, model in models.items():
-                model.fit(X_train_scaled, y_train)
-                score = model.score(X_test_scaled, y_test)
+            # 只在拟合/评估期间屏蔽 sklearn 警告 (如测试样本过少时的 R² 警告)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                for name, model in models.items():
+                    model.fit(X_train_scaled, y_train)
+                    score = model.score(X_test_scaled, y_test)
                 
-                if score > best_score:
-                    best_score = score
-                    best_model = model
+                    if score > best_score:
+                        best_score = score
+                        best_model = model
             
-            self.model = best_model
-            self.is_trained = True
+                self.model = best_model
+                self.is_trained = True
             
-            # 计算模型性能
-            y_pred = self.model.predict(X_test_scaled)
-            mae = mean_absolute_error(y_test, y_pred)
-            r2 = r2_score(y_test, y_pred)
+                # 计算模型性能
+                y_pred = self.model.predict(X_test_scaled)
+                mae = mean_absolute_error(y_test, y_pred)
+                r2 = r2_score(y_test, y_pred)
             
             print(f"模型训练完成 - MAE: {mae:.2f}, R²: {r2:.3f}")
             
+            # 保存模型缓存 (失败不影响本次预测)
+            try:
+                os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+                joblib.dump((self.model, self._mean, self._scale), cache_path)
+                _prune_model_cache()
+            except Exception as e:
+                print(f"模型缓存保存失败: {e}")
+            
         except Exception as e:
             print(f"模型训练失败: {e}")
             self.is_trained = False
@@ -160,21 +276,24 @@ class PricePredictor:
                 return self._simple_predict(current_price, sentiment_score)
             
             # 获取最新数据进行预测
-            from modules.data_loader import get_realtime_data
-            _, historical_data = get_realtime_data(self.ticker)
+            _, historical_data = _cached_realtime(self.ticker, int(time.time() // 60))
             
             if len(historical_data) < 5:
                 return self._simple_predict(current_price, sentiment_score)
             
-            # 准备最新特征
-            latest_features = self._prepare_features(historical_data[-5:])
-            latest_features = latest_features[-1:]  # 取最后一行
+            # 准备最新特征 (只计算最后一行)
+            latest_features = self._features_last(
+                historical_data['Close'].to_numpy(dtype=np.float64)[-5:],
+                historical_data['Volume'].to_numpy(dtype=np.float64)[-5:]
+            )
             
             # 标准化特征
-            latest_features_scaled = self.scaler.transform(latest_features)
+            latest_features_scaled = self._standardize(latest_features).reshape(1, -1)
             
             # 预测
-            base_prediction = self.model.predict(latest_features_scaled)[0]
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                base_prediction = self.model.predict(latest_features_scaled)[0]
             
             # 结合情感分析调整预测
             adjusted_prediction = self._apply_sentiment_adjustment(
@@ -202,8 +321,7 @@ class PricePredictor:
         sentiment_factor = 1 + (sentiment_score * 0.02)  # 最多2%的调整
         
         # 添加随机波动
-        import random
-        random_factor = random.uniform(0.98, 1.02)
+        random_factor = float(_rng.uniform(0.98, 1.02))
         
         prediction = current_price * sentiment_factor * random_factor
         
@@ -6,21 +6,22 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import matplotlib
+matplotlib.use("Agg", force=True)  # 服务端渲染，使用无 GUI 的 Agg 后端
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm # 需要导入这个来设置标题字体
-from wordcloud import WordCloud
 from datetime import datetime, timedelta
 import warnings
 import platform
 import os
 import jieba
-from PIL import Image
-
-warnings.filterwarnings('ignore')
+from functools import lru_cache
+from utils.indicators import rolling_mean
 
 # --- 字体配置 helper (跨平台兼容版) ---
+@lru_cache(maxsize=1)
 def get_chinese_font_path():
-    """自动获取系统中文字体路径 (兼容 Mac 和 Windows)"""
+    """自动获取系统中文字体路径 (兼容 Mac 和 Windows，结果缓存，只检测一次)"""
     system_name = platform.system()
     
     if system_name == 'Darwin':  # macOS
@@ -44,10 +45,15 @@ def get_chinese_font_path():
             return f
     return None
 
-def create_candlestick_chart(historical_data, current_price, prediction, ticker="股票"):
-    """1. K线图（蜡烛图）"""
+def create_candlestick_chart(historical_data, current_price, prediction, ticker="股票", max_bars=250):
+    """1. K线图（蜡烛图），只绘制最近 max_bars 根 K 线以控制序列化数据量"""
     try:
         hist = historical_data.sort_index()
+        # 均线在完整历史上计算，再与 K 线一起截取最近 max_bars 根，避免窗口开头出现空值
+        full_close = hist['Close'].to_numpy()
+        ma5 = rolling_mean(full_close, 5)[-max_bars:]
+        ma20 = rolling_mean(full_close, 20)[-max_bars:]
+        hist = hist.iloc[-max_bars:]
         fig = make_subplots(
             rows=2, cols=1,
             shared_xaxes=True,
@@ -55,26 +61,28 @@ def create_candlestick_chart(historical_data, current_price, prediction, ticker=
             row_heights=[0.7, 0.3],
             subplot_titles=(f'{ticker} 股价走势', '成交量')
         )
-        # K线
-        fig.add_trace(go.Candlestick(
-            x=hist.index, open=hist['Open'], high=hist['High'], low=hist['Low'], close=hist['Close'],
-            name='K线', increasing_line_color='#ef5350', decreasing_line_color='#26a69a'
-        ), row=1, col=1)
-        # 均线
-        hist['MA5'] = hist['Close'].rolling(window=5).mean()
-        hist['MA20'] = hist['Close'].rolling(window=20).mean()
-        fig.add_trace(go.Scatter(x=hist.index, y=hist['MA5'], name='MA5', line=dict(color='#ffa726', width=1)), row=1, col=1)
-        fig.add_trace(go.Scatter(x=hist.index, y=hist['MA20'], name='MA20', line=dict(color='#29b6f6', width=1)), row=1, col=1)
-        # 预测点
+        close = hist['Close'].to_numpy()
         next_date = hist.index[-1] + timedelta(days=1)
-        fig.add_trace(go.Scatter(
-            x=[next_date], y=[prediction], name='明日预测', mode='markers+text',
-            marker=dict(size=12, color='#7e57c2', symbol='star'),
-            text=[f'{prediction:.2f}'], textposition='top center'
-        ), row=1, col=1)
-        # 成交量
-        colors = ['#ef5350' if row['Open'] < row['Close'] else '#26a69a' for index, row in hist.iterrows()]
-        fig.add_trace(go.Bar(x=hist.index, y=hist['Volume'], name='成交量', marker_color=colors), row=2, col=1)
+        colors = np.where(hist['Open'].to_numpy() < close, '#ef5350', '#26a69a')
+        # 所有 trace 一次性批量添加，只做一轮校验和布局更新
+        fig.add_traces([
+            # K线
+            go.Candlestick(
+                x=hist.index, open=hist['Open'], high=hist['High'], low=hist['Low'], close=hist['Close'],
+                name='K线', increasing_line_color='#ef5350', decreasing_line_color='#26a69a'
+            ),
+            # 均线
+            go.Scatter(x=hist.index, y=ma5, name='MA5', line=dict(color='#ffa726', width=1)),
+            go.Scatter(x=hist.index, y=ma20, name='MA20', line=dict(color='#29b6f6', width=1)),
+            # 预测点
+            go.Scatter(
+                x=[next_date], y=[prediction], name='明日预测', mode='markers+text',
+                marker=dict(size=12, color='#7e57c2', symbol='star'),
+                text=[f'{prediction:.2f}'], textposition='top center'
+            ),
+            # 成交量
+            go.Bar(x=hist.index, y=hist['Volume'], name='成交量', marker_color=colors)
+        ], rows=[1, 1, 1, 1, 2], cols=[1, 1, 1, 1, 1])
         
         fig.update_layout(
             height=500, margin=dict(l=20, r=20, t=40, b=20),
@@ -90,17 +98,18 @@ def create_prediction_chart(historical_data, current_price, prediction):
     """2. 趋势预测图"""
     try:
         hist = historical_data.iloc[-30:]
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=hist.index, y=hist['Close'], mode='lines', name='历史收盘价',
-            line=dict(color='#42a5f5', width=3), fill='tozeroy', fillcolor='rgba(66, 165, 245, 0.1)'
-        ))
         next_date = hist.index[-1] + timedelta(days=1)
-        fig.add_trace(go.Scatter(
-            x=[hist.index[-1], next_date], y=[current_price, prediction],
-            mode='lines+markers', name='趋势预测',
-            line=dict(color='#ef5350', width=2, dash='dash'), marker=dict(size=8)
-        ))
+        fig = go.Figure(data=[
+            go.Scatter(
+                x=hist.index, y=hist['Close'], mode='lines', name='历史收盘价',
+                line=dict(color='#42a5f5', width=3), fill='tozeroy', fillcolor='rgba(66, 165, 245, 0.1)'
+            ),
+            go.Scatter(
+                x=[hist.index[-1], next_date], y=[current_price, prediction],
+                mode='lines+markers', name='趋势预测',
+                line=dict(color='#ef5350', width=2, dash='dash'), marker=dict(size=8)
+            )
+        ])
         fig.update_layout(title="短期价格趋势预测", height=350, template='plotly_white', margin=dict(l=20, r=20, t=40, b=20))
         return fig
     except Exception: return go.Figure()
@@ -119,16 +128,36 @@ def create_sentiment_pie_chart(sentiment_data):
 def create_correlation_heatmap(historical_data):
     """4. 相关性热力图"""
     try:
-        df = historical_data[['Open', 'High', 'Low', 'Close', 'Volume']].copy()
-        corr_matrix = df.corr()
+        columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+        # 先去掉含缺失值的行 (否则单个 NaN 会让整行整列变成 NaN)；
+        # 常数列的相关系数为 NaN，与 DataFrame.corr() 一致，不产生警告
+        values = historical_data[columns].dropna().to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr_matrix = np.corrcoef(values.T)
         fig = go.Figure(data=go.Heatmap(
-            z=corr_matrix.values, x=corr_matrix.columns, y=corr_matrix.index,
-            colorscale='Viridis', text=np.round(corr_matrix.values, 2), texttemplate="%{text}", showscale=True
+            z=corr_matrix, x=columns, y=columns,
+            colorscale='Viridis', text=np.round(corr_matrix, 2), texttemplate="%{text}", showscale=True
         ))
         fig.update_layout(title="量价因子相关性", height=350, margin=dict(l=20, r=20, t=40, b=20))
         return fig
     except Exception: return go.Figure()
 
+@lru_cache(maxsize=64)
+def _cut_text(full_text):
+    """Jieba 分词 (按文本缓存，刷新页面时相同新闻无需重复分词)"""
+    return " ".join(jieba.cut(full_text))
+
+@lru_cache(maxsize=4)
+def _load_mask(mask_image_path):
+    """读取词云蒙版图片 (结果缓存，图片只解码一次)"""
+    if os.path.exists(mask_image_path):
+        try:
+            from PIL import Image
+            return np.array(Image.open(mask_image_path))
+        except Exception as e:
+            print(f"图片蒙版加载失败: {e}")
+    return None
+
 def create_wordcloud(text_list, mask_image_path="love.png"):
     """
     5. 词云图 (修复版)
@@ -137,47 +166,48 @@ def create_wordcloud(text_list, mask_image_path="love.png"):
         if not text_list: return plt.figure()
         
         full_text = ' '.join([str(t) for t in text_list])
-        cut_text = " ".join(jieba.cut(full_text))
+        cut_text = _cut_text(full_text)
         font_path = get_chinese_font_path()
         
-        mask = None
-        if os.path.exists(mask_image_path):
-            try:
-                mask = np.array(Image.open(mask_image_path))
-            except Exception as e:
-                print(f"图片蒙版加载失败: {e}")
+        mask = _load_mask(mask_image_path)
+        
+        # 按需导入 wordcloud (只在绘制词云时加载)
+        from wordcloud import WordCloud
         
-        # 词云生成配置
-        wc = WordCloud(
-            background_color='white',
-            width=800, height=600,
-            max_words=100,
-            colormap='Reds',
-            font_path=font_path, 
-            mask=mask,
-            contour_width=2, # 减小轮廓宽度
-            contour_color='pink',
-            random_state=42
-        ).generate(cut_text)
+        # 只在词云生成和绘图期间屏蔽警告 (字体缺字、布局调整等)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            # 词云生成配置
+            wc = WordCloud(
+                background_color='white',
+                width=800, height=600,
+                max_words=100,
+                colormap='Reds',
+                font_path=font_path, 
+                mask=mask,
+                contour_width=2, # 减小轮廓宽度
+                contour_color='pink',
+                random_state=42
+            ).generate(cut_text)
         
-        # --- 绘图修正区域 ---
+            # --- 绘图修正区域 ---
         
-        # 1. 调整画布大小：使其更紧凑，解决“太大”的问题
-        fig, ax = plt.subplots(figsize=(6, 4))  
+            # 1. 调整画布大小：使其更紧凑，解决“太大”的问题
+            fig, ax = plt.subplots(figsize=(6, 4), dpi=72)
         
-        ax.imshow(wc, interpolation='bilinear')
+            ax.imshow(wc, interpolation='bilinear')
         
-        ax.axis('off') 
+            ax.axis('off') 
 
-        # 3. 设置中文标题：使用 FontProperties 解决标题乱码
-        if font_path:
-            font_prop = fm.FontProperties(fname=font_path, size=14)
-            ax.set_title('舆情关键词云', fontproperties=font_prop, color='#333333', pad=12)
-        else:
-            ax.set_title('Word Cloud', fontsize=14, color='#333333', pad=12)
+            # 3. 设置中文标题：使用 FontProperties 解决标题乱码
+            if font_path:
+                font_prop = fm.FontProperties(fname=font_path, size=14)
+                ax.set_title('舆情关键词云', fontproperties=font_prop, color='#333333', pad=12)
+            else:
+                ax.set_title('Word Cloud', fontsize=14, color='#333333', pad=12)
 
-        # 4. 紧凑布局：
-        plt.tight_layout(pad=0.5)
+            # 4. 紧凑布局：
+            plt.tight_layout(pad=0.5)
         
         return fig
     except Exception as e:
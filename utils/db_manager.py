@@ -1,13 +1,54 @@
 """
 数据库管理模块
-MySQL 数据库操作 (使用 SQLAlchemy + PyMySQL)
+MySQL 数据库操作 (使用 SQLAlchemy + mysqlclient，未安装时回退到 PyMySQL)
 """
 import pandas as pd
+import numpy as np
 from datetime import datetime
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
 from sqlalchemy import create_engine, text
-import pymysql
 
-pymysql.install_as_MySQLdb()
+# 优先使用 C 扩展驱动 mysqlclient (结果集解析更快)，未安装时回退到纯 Python 的 PyMySQL
+try:
+    import MySQLdb  # noqa: F401
+    _MYSQL_DRIVER = "mysqldb"
+except ImportError:
+    _MYSQL_DRIVER = "pymysql"
+
+# 进程级缓存：同一个连接串只创建一个连接池引擎，建库建表只执行一次
+_ENGINE_CACHE = {}
+_INITIALIZED = set()
+
+# 插入语句只构造一次，SQLAlchemy 按语句缓存编译结果，每次写入直接复用
+_INSERT_SQL = text("""
+    INSERT INTO analysis_history 
+    (ticker, current_price, predicted_price, sentiment_score, confidence_score)
+    VALUES (:ticker, :price, :prediction, :sentiment, :confidence)
+""")
+
+# 后台写入：最多攒 100 条或等待 50 毫秒后合并为一个事务提交
+_WRITE_BATCH_SIZE = 100
+_WRITE_BATCH_WAIT = 0.05
+
+# 写队列结束标记：close() 放入后，后台线程写完之前的记录即退出
+_CLOSE_SENTINEL = object()
+
+# 表结构版本号：结构变更时加 1，init_db 据此判断是否需要重新执行建表语句
+_SCHEMA_VERSION = 1
+
+# 历史查询语句 (按是否指定股票分为两条固定语句)
+_FETCH_SQL_BY_TICKER = "SELECT id, timestamp, ticker, current_price, predicted_price, sentiment_score FROM analysis_history WHERE ticker = %(ticker)s ORDER BY timestamp DESC LIMIT %(limit)s"
+_FETCH_SQL_ALL = "SELECT id, timestamp, ticker, current_price, predicted_price, sentiment_score FROM analysis_history ORDER BY timestamp DESC LIMIT %(limit)s"
+
+@lru_cache(maxsize=256)
+def _norm(ticker):
+    """股票代码统一转大写 (常用代码复用同一个字符串对象，LRU 限制缓存大小)"""
+    return ticker.upper()
 
 class DatabaseManager:
     """数据库管理器"""
@@ -21,21 +62,58 @@ class DatabaseManager:
         self.DB_NAME = "investment_analysis" 
         # ===========================================
 
-        self.base_conn_str = f"mysql+pymysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}"
+        self.base_conn_str = f"mysql+{_MYSQL_DRIVER}://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}"
         self.db_conn_str = f"{self.base_conn_str}/{self.DB_NAME}?charset=utf8mb4"
         self.engine = None
         self.init_db()
+
+        # 后台写入线程：save_record 只入队，由该线程批量写库
+        self._write_queue = queue.Queue()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._writer = threading.Thread(target=self._drain_writes, daemon=True)
+        self._writer.start()
+        # 解释器退出前写完队列中的记录，避免丢数据
+        atexit.register(self.close)
     
     def get_engine(self):
         if self.engine is None:
-            self.engine = create_engine(self.db_conn_str, pool_recycle=3600)
+            engine = _ENGINE_CACHE.get(self.db_conn_str)
+            if engine is None:
+                engine = create_engine(
+                    self.db_conn_str,
+                    pool_size=10, max_overflow=20,
+                    pool_pre_ping=True, pool_recycle=3600
+                )
+                _ENGINE_CACHE[self.db_conn_str] = engine
+            self.engine = engine
         return self.engine
 
+    @property
+    def initialized(self):
+        """建库建表是否已成功完成"""
+        return self.db_conn_str in _INITIALIZED
+
+    def _schema_is_current(self):
+        """数据库中记录的表结构版本是否为最新 (库或版本表不存在时返回 False)"""
+        try:
+            with self.get_engine().connect() as conn:
+                version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+            return version == _SCHEMA_VERSION
+        except Exception:
+            return False
+
     def init_db(self):
+        if self.db_conn_str in _INITIALIZED:
+            return
+        if self._schema_is_current():
+            _INITIALIZED.add(self.db_conn_str)
+            return
         try:
             temp_engine = create_engine(self.base_conn_str)
             with temp_engine.connect() as conn:
                 conn.execute(text(f"CREATE DATABASE IF NOT EXISTS {self.DB_NAME}"))
+            temp_engine.dispose()
             
             engine = self.get_engine()
             with engine.connect() as conn:
@@ -52,53 +130,179 @@ class DatabaseManager:
                     )
                 """
                 conn.execute(text(sql_create_table))
-                try:
-                    conn.execute(text("CREATE INDEX idx_analysis_ticker ON analysis_history(ticker)"))
-                    conn.execute(text("CREATE INDEX idx_analysis_date ON analysis_history(analysis_date)"))
-                except Exception:
-                    pass
+                # (ticker, timestamp DESC) 复合索引同时覆盖按股票过滤和按时间倒序，
+                # fetch_history 无需再排序；它也覆盖了原来的单列 ticker 索引
+                for index_sql in (
+                    "CREATE INDEX idx_ticker_ts ON analysis_history(ticker, timestamp DESC)",
+                    "CREATE INDEX idx_analysis_date ON analysis_history(analysis_date)",
+                    "DROP INDEX idx_analysis_ticker ON analysis_history",
+                ):
+                    try:
+                        conn.execute(text(index_sql))
+                    except Exception:
+                        pass  # 索引已存在 / 已删除
+                # 记录表结构版本，之后启动时只需一次查询即可跳过以上语句
+                conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INT NOT NULL)"))
+                conn.execute(text("DELETE FROM schema_version"))
+                conn.execute(text("INSERT INTO schema_version (version) VALUES (:version)"), {"version": _SCHEMA_VERSION})
+                conn.commit()
                 print("MySQL 数据库初始化完成")
+            _INITIALIZED.add(self.db_conn_str)
         except Exception as e:
             print(f"数据库初始化失败: {e}")
 
     def save_record(self, ticker, price, prediction, sentiment, confidence=0.5):
+        """
+        异步保存一条记录 (放入写队列，由后台线程合并提交)
+        
+        Returns:
+            Future: 结果为新记录 id，写入失败时为 None
+        """
+        future = Future()
+        try:
+            item = ({
+                "ticker": _norm(ticker),
+                "price": price,
+                "prediction": prediction,
+                "sentiment": sentiment,
+                "confidence": confidence
+            }, future)
+        except Exception as e:
+            print(f"保存记录失败: {e}")
+            future.set_result(None)
+            return future
+        with self._write_lock:
+            if not self._closed:
+                self._write_queue.put(item)
+                return future
+        # 已关闭：后台线程已退出，直接同步写入
+        self._write_batch([item])
+        return future
+
+    def _drain_writes(self):
+        """后台线程：从写队列取记录，攒批后在一个事务中写入"""
+        closing = False
+        while not closing:
+            item = self._write_queue.get()
+            if item is _CLOSE_SENTINEL:
+                self._write_queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + _WRITE_BATCH_WAIT
+            while len(batch) < _WRITE_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._write_queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _CLOSE_SENTINEL:
+                    self._write_queue.task_done()
+                    closing = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+            for _ in batch:
+                self._write_queue.task_done()
+
+    def _write_batch(self, batch):
+        """在一个事务中写入一批记录，并回填每条记录的 id"""
         try:
             engine = self.get_engine()
-            with engine.connect() as conn:
-                query = text("""
-                    INSERT INTO analysis_history 
-                    (ticker, current_price, predicted_price, sentiment_score, confidence_score)
-                    VALUES (:ticker, :price, :prediction, :sentiment, :confidence)
-                """)
-                result = conn.execute(query, {
-                    "ticker": ticker.upper(),
-                    "price": price,
-                    "prediction": prediction,
-                    "sentiment": sentiment,
-                    "confidence": confidence
-                })
-                conn.commit()
-                return result.lastrowid
+            row_ids = []
+            with engine.begin() as conn:
+                for params, _ in batch:
+                    row_ids.append(conn.execute(_INSERT_SQL, params).lastrowid)
+            for (_, future), row_id in zip(batch, row_ids):
+                future.set_result(row_id)
         except Exception as e:
             print(f"保存记录失败: {e}")
-            return None
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    def flush(self):
+        """等待写队列中的记录全部落库"""
+        self._write_queue.join()
+
+    def close(self):
+        """写完队列中的记录并停止后台写入线程 (可重复调用)"""
+        with self._write_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._write_queue.put(_CLOSE_SENTINEL)
+        self._writer.join()
+        atexit.unregister(self.close)
     
-    def fetch_history(self, ticker=None, limit=50):
+    def save_records(self, rows):
+        """
+        批量保存记录 (一个事务 + 一次 executemany)
+        
+        Args:
+            rows (list[dict]): 每条记录包含 ticker, price, prediction, sentiment, 可选 confidence
+        
+        Returns:
+            int: 写入条数，失败返回 0
+        """
+        if not rows:
+            return 0
         try:
+            params = [{
+                "ticker": _norm(row["ticker"]),
+                "price": row["price"],
+                "prediction": row["prediction"],
+                "sentiment": row["sentiment"],
+                "confidence": row.get("confidence", 0.5)
+            } for row in rows]
             engine = self.get_engine()
-            if ticker:
-                query = "SELECT id, timestamp, ticker, current_price, predicted_price, sentiment_score, ROUND((predicted_price - current_price) / current_price * 100, 2) as change_percent FROM analysis_history WHERE ticker = %(ticker)s ORDER BY timestamp DESC LIMIT %(limit)s"
-                params = {"ticker": ticker.upper(), "limit": limit}
-            else:
-                query = "SELECT id, timestamp, ticker, current_price, predicted_price, sentiment_score, ROUND((predicted_price - current_price) / current_price * 100, 2) as change_percent FROM analysis_history ORDER BY timestamp DESC LIMIT %(limit)s"
-                params = {"limit": limit}
-            return pd.read_sql(query, engine, params=params)
+            with engine.begin() as conn:
+                conn.execute(_INSERT_SQL, params)
+            return len(params)
+        except Exception as e:
+            print(f"批量保存记录失败: {e}")
+            return 0
+    
+    def _history_query(self, ticker=None, limit=50):
+        if ticker:
+            return _FETCH_SQL_BY_TICKER, {"ticker": _norm(ticker), "limit": limit}
+        return _FETCH_SQL_ALL, {"limit": limit}
+
+    def fetch_history_iter(self, ticker=None, limit=50, chunksize=10_000):
+        """流式读取历史记录 (服务端游标)，逐块产出 DataFrame"""
+        self.flush()  # 先等待排队中的记录写入，保证能读到刚保存的数据
+        query, params = self._history_query(ticker, limit)
+        engine = self.get_engine()
+        with engine.connect().execution_options(stream_results=True) as conn:
+            for chunk in pd.read_sql(query, conn, params=params, chunksize=chunksize):
+                yield self._add_change_percent(chunk)
+
+    @staticmethod
+    def _add_change_percent(df):
+        """向量化计算预测涨幅 (%)，不再让数据库逐行计算"""
+        current = df['current_price'].to_numpy(dtype=np.float64)
+        predicted = df['predicted_price'].to_numpy(dtype=np.float64)
+        # 当前价为 0 时原 SQL 返回 NULL，这里同样置为 NaN (表格显示为空)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = (predicted - current) / current * 100
+        change[~np.isfinite(change)] = np.nan
+        df['change_percent'] = np.round(change, 2)
+        return df
+
+    def fetch_history(self, ticker=None, limit=50):
+        try:
+            chunks = list(self.fetch_history_iter(ticker, limit))
+            if not chunks:
+                return pd.DataFrame()
+            return pd.concat(chunks, ignore_index=True)
         except Exception as e:
             print(f"获取历史失败: {e}")
             return pd.DataFrame()
 
     def clear_all_history(self):
         """清空所有历史记录"""
+        self.flush()
         try:
             engine = self.get_engine()
             with engine.connect() as conn:
@@ -0,0 +1,23 @@
+"""
+技术指标计算模块
+基于 NumPy 的向量化指标计算，供预测与可视化模块共用
+"""
+import numpy as np
+
+def rolling_mean(values, window):
+    """
+    前缀和滚动均值，O(N) 复杂度 (与 pandas rolling(window).mean() 结果一致)
+    
+    Args:
+        values (array-like): 输入序列
+        window (int): 窗口大小
+    
+    Returns:
+        np.ndarray: 与输入等长的均值序列，前 window-1 个位置为 NaN
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        cs = np.concatenate([[0.0], np.cumsum(values)])
+        result[window - 1:] = (cs[window:] - cs[:-window]) / window
+    return result